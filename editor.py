@@ -5,6 +5,7 @@ from __future__ import print_function
 
 import sys
 import locale
+import mmap
 import os.path
 import shlex
 import subprocess
@@ -13,69 +14,147 @@ import tempfile
 __all__ = [
     'edit',
     'get_editor',
+    'clear_editor_cache',
     'EditorError',
 ]
 
 __version__ = '1.0.5'
 
+# The resolved editor command.  The environment and the set of installed
+# editors are not expected to change while the process is running, so
+# get_editor() only does the lookup once.
+_CACHED_EDITOR = None
+# distutils' find_executable, or shutil.which without distutils; see
+# _get_find_executable().
+_find_executable = None
+# Default editors already found on PATH, by name.  Misses are not kept, so
+# an editor installed later is still picked up.
+_WHICH_CACHE = {}
+# Everything edit() needs that doesn't change between calls; see
+# _load_config().
+_CFG = None
+
+# Files are read and written with raw os calls; keep Windows from
+# translating newlines.
+_O_BINARY = getattr(os, 'O_BINARY', 0)
+_O_CLOEXEC = getattr(os, 'O_CLOEXEC', 0)
+_READ_SIZE = 8192
+_MMAP_THRESHOLD = 1024 * 1024
+
 
 class EditorError(RuntimeError):
     pass
 
 
-def get_default_editors():
-    # TODO: Make platform-specific
-    return [
-        'editor',
-        'vim',
-        'emacs',
-        'nano',
-    ]
+# TODO: Make platform-specific
+_DEFAULT_EDITORS = (
+    'editor',
+    'vim',
+    'emacs',
+    'nano',
+)
 
 
-def get_editor_args(editor):
-    if editor in ['vim', 'gvim', 'vim.basic', 'vim.tiny']:
-        return ['-f', '-o']
+def get_default_editors():
+    return _DEFAULT_EDITORS
+
+
+# Extra arguments needed to make an editor block until the file is closed
+# and/or run inside the terminal, keyed by the editor's basename.
+_EDITOR_ARGS = {
+    'vim': ('-f', '-o'),
+    'gvim': ('-f', '-o'),
+    'vim.basic': ('-f', '-o'),
+    'vim.tiny': ('-f', '-o'),
+    'emacs': ('-nw',),
+    'emacsclient': ('-nw',),
+    'gedit': ('-w', '--new-window'),
+    'nano': ('-R',),
+    'code': ('-w', '-n'),
+}
+_EMPTY = ()
+
+# Editors that open their own window, so redirecting their stdout to the
+# TTY is pointless, and the flags that make them run in the terminal.
+_GUI_EDITORS = {
+    'gvim': ('-v',),
+    'gedit': (),
+    'code': (),
+}
 
-    elif editor in ['emacs', 'emacsclient']:
-        return ['-nw']
 
-    elif editor == 'gedit':
-        return ['-w', '--new-window']
+def get_editor_args(editor):
+    return list(_EDITOR_ARGS.get(editor, _EMPTY))
 
-    elif editor == 'nano':
-        return ['-R']
 
-    elif editor == 'code':
-        return ["-w", "-n"]
+def clear_editor_cache(paths=True):
+    """Forget the editor resolved by get_editor().
 
-    else:
-        return []
+    Call this after changing $VISUAL or $EDITOR at runtime.  Pass
+    paths=False to keep the PATH lookups for the default editors.
+    """
+    global _CACHED_EDITOR, _CFG
+    _CACHED_EDITOR = None
+    _CFG = None
+    if paths:
+        _WHICH_CACHE.clear()
 
 
 def get_editor():
-    # The import from distutils needs to be here, at this low level to
-    # prevent import of 'editor' itself from breaking inquirer. This
-    # has to do with ubuntu (debian) python packages artificially
-    # separated from distutils.
-    #
-    # If this import is at top level inquirer breaks on ubuntu until
-    # the user explicitly apt-get install python3-distutils. With the
-    # import here it will only break if the code is utilizing the
-    # inquirer editor prompt.
-    try:
-        from distutils.spawn import find_executable
-    except ImportError:
-        from shutil import which as find_executable
+    global _CACHED_EDITOR
+    if _CACHED_EDITOR is None:
+        _CACHED_EDITOR = _find_editor()
+    return _CACHED_EDITOR
+
 
+def _get_env_editor():
     # Get the editor from the environment.  Prefer VISUAL to EDITOR
-    editor = os.environ.get('VISUAL') or os.environ.get('EDITOR')
+    if os.supports_bytes_environ:
+        # Read the raw bytes and decode only the value that is used, the
+        # same way os.environ would.
+        raw = os.environb.get(b'VISUAL') or os.environb.get(b'EDITOR')
+        return os.fsdecode(raw) if raw else None
+    return os.environ.get('VISUAL') or os.environ.get('EDITOR')
+
+
+def _get_find_executable():
+    global _find_executable
+    if _find_executable is None:
+        # The import from distutils needs to be here, at this low level to
+        # prevent import of 'editor' itself from breaking inquirer. This
+        # has to do with ubuntu (debian) python packages artificially
+        # separated from distutils.
+        #
+        # If this import is at top level inquirer breaks on ubuntu until
+        # the user explicitly apt-get install python3-distutils. With the
+        # import here it will only break if the code is utilizing the
+        # inquirer editor prompt.  The choice is made once and kept in
+        # _find_executable.
+        try:
+            from distutils.spawn import find_executable
+        except ImportError:
+            from shutil import which as find_executable
+        _find_executable = find_executable
+    return _find_executable
+
+
+def _which(name):
+    path = _WHICH_CACHE.get(name)
+    if path is None:
+        path = _get_find_executable()(name)
+        if path is not None:
+            _WHICH_CACHE[name] = path
+    return path
+
+
+def _find_editor():
+    editor = _get_env_editor()
     if editor:
         return editor
 
     # None found in the environment.  Fallback to platform-specific defaults.
     for ed in get_default_editors():
-        path = find_executable(ed)
+        path = _which(ed)
         if path is not None:
             return path
 
@@ -83,46 +162,173 @@ def get_editor():
         "Please consider setting your $EDITOR variable")
 
 
-def get_tty_filename():
-    if sys.platform == 'win32':
+def _tty_path(platform):
+    if platform == 'win32':
         return 'CON:'
     return '/dev/tty'
 
 
-def edit(filename=None, contents=None, use_tty=None, suffix=''):
+_TTY_PATH = _tty_path(sys.platform)
+
+# Descriptor for _TTY_PATH, opened on first use and shared by every edit().
+_tty_fd = None
+
+
+def _isatty(fd):
+    try:
+        return os.isatty(fd)
+    except OSError:
+        return False
+
+
+# Whether stdin/stdout are terminals; fixed for the life of the process.
+_STDIN_TTY = _isatty(0)
+_STDOUT_TTY = _isatty(1)
+
+
+def get_tty_filename():
+    return _TTY_PATH
+
+
+def _get_tty_stdout():
+    global _tty_fd
+    if _tty_fd is None:
+        _tty_fd = os.open(get_tty_filename(),
+                          os.O_WRONLY | _O_CLOEXEC | _O_BINARY)
+    return _tty_fd
+
+
+def _parse_editor(editor):
     # editor can include CLI flags, e.g. "emacsclient -c"
-    editor = shlex.split(get_editor())
+    argv = shlex.split(editor)
+
+    # The basename of the actual editor command (ignoring flags) is used to
+    # look up additional args.  Only paths are resolved, so that e.g.
+    # /usr/bin/editor -> vim.basic is recognized; realpath() on a bare
+    # command name would only resolve it against the working directory.
+    command = argv[0]
+    if os.path.dirname(command):
+        command = os.path.realpath(command)
+    return tuple(argv), os.path.basename(command)
+
+
+class _EditConfig(object):
+    __slots__ = ('argv', 'basename', 'extra_args', 'gui', 'stdin_tty',
+                 'stdout_tty')
+
+    def __init__(self, argv, basename, extra_args, gui, stdin_tty,
+                 stdout_tty):
+        self.argv = argv
+        self.basename = basename
+        self.extra_args = extra_args
+        self.gui = gui
+        self.stdin_tty = stdin_tty
+        self.stdout_tty = stdout_tty
+
+
+def _is_gui_editor(argv, basename):
+    terminal_flags = _GUI_EDITORS.get(basename)
+    if terminal_flags is None:
+        return False
+    return not any(flag in argv[1:] for flag in terminal_flags)
+
+
+def _load_config():
+    global _CFG
+    argv, basename = _parse_editor(get_editor())
+    cfg = _EditConfig(argv, basename, tuple(get_editor_args(basename)),
+                      _is_gui_editor(argv, basename), _STDIN_TTY, _STDOUT_TTY)
+    # Published in one assignment; threads racing on the first call just
+    # build the same snapshot twice.
+    _CFG = cfg
+    return cfg
+
+
+def _write_all(fd, contents):
+    view = memoryview(contents)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _write_file(filename, contents):
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | _O_BINARY,
+                 0o666)
+    try:
+        _write_all(fd, contents)
+    finally:
+        os.close(fd)
 
-    # Get additional args based on the actual editor command (and ignore flags)
-    additional_args = get_editor_args(os.path.basename(os.path.realpath(editor[0])))
-    args = editor + additional_args
 
-    if use_tty is None:
-        use_tty = sys.stdin.isatty() and not sys.stdout.isatty()
+def _read_file(filename):
+    fd = os.open(filename, os.O_RDONLY | _O_BINARY)
+    try:
+        size = os.fstat(fd).st_size
+        if size >= _MMAP_THRESHOLD:
+            # Copy large files straight out of the page cache.
+            try:
+                with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as mm:
+                    return mm[:]
+            except (OSError, ValueError):
+                # Not every file system supports mmap(); read it instead.
+                pass
+
+        # Normally a single read() sized to the file, plus one to see EOF.
+        size = size or _READ_SIZE
+        chunks = []
+        while True:
+            chunk = os.read(fd, size)
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+
+
+def edit(filename=None, contents=None, use_tty=None, suffix=''):
+    cfg = _CFG or _load_config()
 
-    if filename is None:
-        tmp = tempfile.NamedTemporaryFile(suffix=suffix)
-        filename = tmp.name
+    if use_tty is None:
+        # GUI editors open their own window and never write to the terminal.
+        use_tty = cfg.stdin_tty and not cfg.stdout_tty and not cfg.gui
 
     if contents is not None:
         # For python3 only.  If str is passed instead of bytes, encode default
         if hasattr(contents, 'encode'):
             contents = contents.encode()
 
-        with open(filename, mode='wb') as f:
-            f.write(contents)
+    if filename is not None:
+        if contents is not None:
+            _write_file(filename, contents)
+        return _run_editor(cfg, filename, use_tty)
+
+    # Stage the contents through the descriptor mkstemp() already opened.
+    fd, filename = tempfile.mkstemp(suffix=suffix)
+    try:
+        try:
+            if contents:
+                _write_all(fd, contents)
+        finally:
+            os.close(fd)
+        return _run_editor(cfg, filename, use_tty)
+    finally:
+        os.unlink(filename)
+
 
-    args += [filename]
+def _run_editor(cfg, filename, use_tty):
+    args = [*cfg.argv, *cfg.extra_args, filename]
 
     stdout = None
     if use_tty:
-        stdout = open(get_tty_filename(), 'wb')
+        stdout = _get_tty_stdout()
 
-    proc = subprocess.Popen(args, close_fds=True, stdout=stdout)
-    proc.communicate()
+    # Leaving close_fds off lets subprocess use posix_spawn().  Descriptors
+    # Python opens are non-inheritable (PEP 446), but anything this process
+    # inherited at exec (make jobserver pipes, socket-activation fds, a
+    # shell's 3>file) or marked inheritable is passed on to the editor too.
+    proc = subprocess.Popen(args, close_fds=False, stdout=stdout)
+    proc.wait()
 
-    with open(filename, mode='rb') as f:
-        return f.read()
+    return _read_file(filename)
 
 
 def _get_editor(ns):
@@ -1,3 +1,8 @@
+import mmap
+import os
+import shutil
+import sys
+import tempfile
 from typing import List, Optional, Union
 import pytest
 from pytest_mock import MockerFixture
@@ -6,35 +11,31 @@ from _pytest.monkeypatch import MonkeyPatch
 import editor
 
 
-@pytest.fixture
-def mock_find_executable(mocker: MockerFixture):
-    """Mock both possible find_executable functions to handle runtime imports."""
-    # Mock both import paths since get_editor() imports at runtime
-    mock_distutils = None
-    mock_shutil = None
+@pytest.fixture(autouse=True)
+def clear_editor_cache():
+    """Make every test resolve the editor from scratch."""
+    editor.clear_editor_cache()
+    yield
+    editor.clear_editor_cache()
 
-    # Try to mock distutils.spawn.find_executable if available
-    try:
-        mock_distutils = mocker.patch("distutils.spawn.find_executable")
-    except (ImportError, AttributeError):
-        pass
 
-    # Always mock shutil.which as fallback
-    mock_shutil = mocker.patch("shutil.which")
+@pytest.fixture
+def test_file(tmp_path) -> str:
+    """An existing file for edit() to open."""
+    path = tmp_path / "test.txt"
+    path.write_bytes(b"test content")
+    return str(path)
 
-    # Return the mock that will actually be used based on what's available
-    # If distutils is available, it will be used first by get_editor()
-    try:
-        import distutils.spawn
 
-        return mock_distutils if mock_distutils else mock_shutil
-    except ImportError:
-        return mock_shutil
+@pytest.fixture
+def mock_find_executable(mocker: MockerFixture):
+    """Mock the find_executable function get_editor() resolved."""
+    return mocker.patch("editor._find_executable")
 
 
 def test_get_default_editors() -> None:
     """Test that get_default_editors returns expected editors."""
-    assert editor.get_default_editors() == ["editor", "vim", "emacs", "nano"]
+    assert editor.get_default_editors() == ("editor", "vim", "emacs", "nano")
 
 
 @pytest.mark.parametrize(
@@ -86,7 +87,7 @@ def test_get_editor_environment_variables(
 
 
 def test_edit_with_editor_command_and_args(
-    mocker: MockerFixture, monkeypatch: MonkeyPatch
+    mocker: MockerFixture, monkeypatch: MonkeyPatch, test_file: str
 ) -> None:
     """Test edit() function handles EDITOR with command arguments."""
     # Set EDITOR to include command arguments
@@ -97,18 +98,82 @@ def test_edit_with_editor_command_and_args(
     mock_process = mocker.MagicMock()
     mock_popen.return_value = mock_process
 
-    mock_open = mocker.mock_open(read_data=b"test content")
-    mocker.patch("builtins.open", mock_open)
-    mocker.patch("sys.stdin.isatty", return_value=True)
-    mocker.patch("sys.stdout.isatty", return_value=True)
+    mocker.patch("editor._STDIN_TTY", True)
+    mocker.patch("editor._STDOUT_TTY", True)
 
-    result = editor.edit(filename="/tmp/test.txt")
+    result = editor.edit(filename=test_file)
 
     assert result == b"test content"
     mock_popen.assert_called_once_with(
-        ["emacsclient", "-c", "-nw", "/tmp/test.txt"], close_fds=True, stdout=None
+        ["emacsclient", "-c", "-nw", test_file], close_fds=False, stdout=None
     )
-    mock_process.communicate.assert_called_once()
+    mock_process.wait.assert_called_once()
+
+
+def test_get_editor_fallback_lookups_are_cached(
+    mocker: MockerFixture, monkeypatch: MonkeyPatch, mock_find_executable
+) -> None:
+    """Test PATH lookups can be kept when the editor cache is cleared."""
+    monkeypatch.delenv("VISUAL", raising=False)
+    monkeypatch.delenv("EDITOR", raising=False)
+
+    mocker.patch("editor.get_default_editors", return_value=["vim"])
+    mock_find_executable.return_value = "/usr/bin/vim"
+
+    assert editor.get_editor() == "/usr/bin/vim"
+    editor.clear_editor_cache(paths=False)
+    assert editor.get_editor() == "/usr/bin/vim"
+    mock_find_executable.assert_called_once_with("vim")
+
+    editor.clear_editor_cache()
+    assert editor.get_editor() == "/usr/bin/vim"
+    assert mock_find_executable.call_count == 2
+
+
+def test_get_editor_finds_editor_installed_later(
+    mocker: MockerFixture, monkeypatch: MonkeyPatch, mock_find_executable
+) -> None:
+    """Test a failed PATH lookup is retried after the cache is cleared."""
+    monkeypatch.delenv("VISUAL", raising=False)
+    monkeypatch.delenv("EDITOR", raising=False)
+
+    mocker.patch("editor.get_default_editors", return_value=["nano"])
+    mock_find_executable.return_value = None
+
+    with pytest.raises(editor.EditorError):
+        editor.get_editor()
+
+    mock_find_executable.return_value = "/usr/bin/nano"
+    editor.clear_editor_cache(paths=False)
+    assert editor.get_editor() == "/usr/bin/nano"
+
+
+def test_find_executable_falls_back_to_shutil(
+    monkeypatch: MonkeyPatch,
+) -> None:
+    """Test shutil.which is used when distutils cannot be imported."""
+    monkeypatch.setattr(editor, "_find_executable", None)
+    monkeypatch.setitem(sys.modules, "distutils.spawn", None)
+
+    assert editor._get_find_executable() is shutil.which
+
+
+def test_parse_editor_bare_command(mocker: MockerFixture) -> None:
+    """Test a bare command name is used as-is, without resolving symlinks."""
+    mock_realpath = mocker.patch("os.path.realpath")
+
+    assert editor._parse_editor("vim -p") == (("vim", "-p"), "vim")
+    mock_realpath.assert_not_called()
+
+
+def test_parse_editor_resolves_symlinked_path(tmp_path) -> None:
+    """Test an editor path is resolved to the real editor's name."""
+    real = tmp_path / "vim.basic"
+    real.touch()
+    link = tmp_path / "editor"
+    link.symlink_to(real)
+
+    assert editor._parse_editor(str(link)) == ((str(link),), "vim.basic")
 
 
 def test_get_editor_fallback_success(
@@ -147,6 +212,19 @@ def test_get_editor_fallback_failure(
     assert "Unable to find a viable editor" in str(exc_info.value)
 
 
+def test_get_editor_is_cached(monkeypatch: MonkeyPatch) -> None:
+    """Test get_editor only consults the environment once until cleared."""
+    monkeypatch.delenv("VISUAL", raising=False)
+    monkeypatch.setenv("EDITOR", "first-editor")
+    assert editor.get_editor() == "first-editor"
+
+    monkeypatch.setenv("EDITOR", "second-editor")
+    assert editor.get_editor() == "first-editor"
+
+    editor.clear_editor_cache()
+    assert editor.get_editor() == "second-editor"
+
+
 @pytest.mark.parametrize(
     "platform,expected_tty",
     [
@@ -156,15 +234,31 @@ def test_get_editor_fallback_failure(
         ("win32", "CON:"),
     ],
 )
-def test_get_tty_filename(
-    mocker: MockerFixture, platform: str, expected_tty: str
+def test_tty_path(platform: str, expected_tty: str) -> None:
+    """Test the TTY device chosen for different platforms."""
+    assert editor._tty_path(platform) == expected_tty
+
+
+def test_get_tty_filename() -> None:
+    """Test get_tty_filename returns the TTY device for this platform."""
+    assert editor.get_tty_filename() == editor._tty_path(sys.platform)
+
+
+def test_get_tty_stdout_is_shared(
+    mocker: MockerFixture, monkeypatch: MonkeyPatch
 ) -> None:
-    """Test get_tty_filename returns correct TTY device for different platforms."""
-    mocker.patch("sys.platform", platform)
-    assert editor.get_tty_filename() == expected_tty
+    """Test the TTY is opened once and the descriptor reused afterwards."""
+    monkeypatch.setattr(editor, "_tty_fd", None)
+    mock_os_open = mocker.patch("os.open", return_value=42)
 
+    assert editor._get_tty_stdout() == 42
+    assert editor._get_tty_stdout() == 42
 
-def test_edit_with_filename(mocker: MockerFixture) -> None:
+    mock_os_open.assert_called_once()
+    assert mock_os_open.call_args[0][0] == editor.get_tty_filename()
+
+
+def test_edit_with_filename(mocker: MockerFixture, test_file: str) -> None:
     """Test edit() function with existing filename."""
     mock_get_editor = mocker.patch("editor.get_editor")
     mock_get_editor_args = mocker.patch("editor.get_editor_args")
@@ -176,18 +270,40 @@ def test_edit_with_filename(mocker: MockerFixture) -> None:
     mock_process = mocker.MagicMock()
     mock_popen.return_value = mock_process
 
-    mock_open = mocker.mock_open(read_data=b"test content")
-    mocker.patch("builtins.open", mock_open)
-    mocker.patch("sys.stdin.isatty", return_value=True)
-    mocker.patch("sys.stdout.isatty", return_value=True)
+    mocker.patch("editor._STDIN_TTY", True)
+    mocker.patch("editor._STDOUT_TTY", True)
 
-    result = editor.edit(filename="/tmp/test.txt")
+    result = editor.edit(filename=test_file)
 
     assert result == b"test content"
     mock_popen.assert_called_once_with(
-        ["/usr/bin/vim", "-f", "-o", "/tmp/test.txt"], close_fds=True, stdout=None
+        ["/usr/bin/vim", "-f", "-o", test_file], close_fds=False, stdout=None
     )
-    mock_process.communicate.assert_called_once()
+    mock_process.wait.assert_called_once()
+
+
+def test_edit_with_filename_and_contents(mocker: MockerFixture, test_file: str) -> None:
+    """Test edit() overwrites an existing file with the given contents."""
+    mocker.patch("editor.get_editor", return_value="/usr/bin/vim")
+    mocker.patch("editor.get_editor_args", return_value=["-f", "-o"])
+    mocker.patch("subprocess.Popen")
+
+    result = editor.edit(filename=test_file, contents=b"new", use_tty=False)
+
+    assert result == b"new"
+
+
+def test_read_file_large(
+    mocker: MockerFixture, monkeypatch: MonkeyPatch, tmp_path
+) -> None:
+    """Test large files are read back through mmap."""
+    monkeypatch.setattr(editor, "_MMAP_THRESHOLD", 4)
+    spy_mmap = mocker.spy(mmap, "mmap")
+    path = tmp_path / "large.txt"
+    path.write_bytes(b"large content")
+
+    assert editor._read_file(str(path)) == b"large content"
+    spy_mmap.assert_called_once()
 
 
 @pytest.mark.parametrize(
@@ -203,6 +319,8 @@ def test_edit_with_filename(mocker: MockerFixture) -> None:
 )
 def test_edit_with_contents(
     mocker: MockerFixture,
+    monkeypatch: MonkeyPatch,
+    tmp_path,
     input_content: Union[str, bytes],
     expected_written_content: bytes,
 ) -> None:
@@ -210,74 +328,67 @@ def test_edit_with_contents(
     mock_get_editor = mocker.patch("editor.get_editor")
     mock_get_editor_args = mocker.patch("editor.get_editor_args")
     mock_popen = mocker.patch("subprocess.Popen")
-    mock_tempfile = mocker.patch("tempfile.NamedTemporaryFile")
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
 
     mock_get_editor.return_value = "/usr/bin/vim"
     mock_get_editor_args.return_value = ["-f", "-o"]
 
-    mock_temp = mocker.MagicMock()
-    mock_temp.name = "/tmp/tmp123"
-    mock_tempfile.return_value = mock_temp
-
-    mock_process = mocker.MagicMock()
-    mock_popen.return_value = mock_process
+    # Stand in for the editor: record what it was given, then change it
+    written = []
 
-    # Mock file operations
-    write_mock = mocker.mock_open()
-    read_mock = mocker.mock_open(read_data=b"edited content")
+    def fake_editor(args, **kwargs):
+        temp_path = tmp_path / os.path.basename(args[-1])
+        written.append(temp_path.read_bytes())
+        temp_path.write_bytes(b"edited content")
+        return mocker.MagicMock()
 
-    mock_open_func = mocker.patch("builtins.open")
-    mock_open_func.side_effect = [
-        write_mock.return_value,
-        read_mock.return_value,
-    ]
+    mock_popen.side_effect = fake_editor
 
-    mocker.patch("sys.stdin.isatty", return_value=True)
-    mocker.patch("sys.stdout.isatty", return_value=True)
+    mocker.patch("editor._STDIN_TTY", True)
+    mocker.patch("editor._STDOUT_TTY", True)
 
     result = editor.edit(contents=input_content)
 
     assert result == b"edited content"
-    write_mock.return_value.write.assert_called_once_with(expected_written_content)
+    assert written == [expected_written_content]
+    temp_filename = mock_popen.call_args[0][0][-1]
     mock_popen.assert_called_once_with(
-        ["/usr/bin/vim", "-f", "-o", "/tmp/tmp123"], close_fds=True, stdout=None
+        ["/usr/bin/vim", "-f", "-o", temp_filename], close_fds=False, stdout=None
     )
+    # The temporary file is removed once the editor's result has been read
+    assert not os.path.exists(temp_filename)
 
 
-def test_edit_with_tty(mocker: MockerFixture) -> None:
+def test_edit_with_tty(mocker: MockerFixture, test_file: str) -> None:
     """Test edit() function with TTY mode."""
     mock_get_editor = mocker.patch("editor.get_editor")
     mock_get_editor_args = mocker.patch("editor.get_editor_args")
     mock_popen = mocker.patch("subprocess.Popen")
-    mock_get_tty_filename = mocker.patch("editor.get_tty_filename")
+    mock_get_tty_stdout = mocker.patch("editor._get_tty_stdout")
 
     mock_get_editor.return_value = "/usr/bin/vim"
     mock_get_editor_args.return_value = ["-f", "-o"]
-    mock_get_tty_filename.return_value = "/dev/tty"
+    mock_get_tty_stdout.return_value = 42
 
     mock_process = mocker.MagicMock()
     mock_popen.return_value = mock_process
 
-    mock_tty_file = mocker.MagicMock()
-    read_mock = mocker.mock_open(read_data=b"test content")
-
-    mock_open_func = mocker.patch("builtins.open")
-    mock_open_func.side_effect = [mock_tty_file, read_mock.return_value]
+    mocker.patch("editor._STDIN_TTY", True)
+    mocker.patch("editor._STDOUT_TTY", False)
 
-    mocker.patch("sys.stdin.isatty", return_value=True)
-    mocker.patch("sys.stdout.isatty", return_value=False)
-
-    result = editor.edit(filename="/tmp/test.txt")
+    result = editor.edit(filename=test_file)
 
     assert result == b"test content"
     mock_popen.assert_called_once_with(
-        ["/usr/bin/vim", "-f", "-o", "/tmp/test.txt"],
-        close_fds=True,
-        stdout=mock_tty_file,
+        ["/usr/bin/vim", "-f", "-o", test_file],
+        close_fds=False,
+        stdout=42,
     )
 
 
-def test_edit_with_suffix(mocker: MockerFixture) -> None:
+def test_edit_with_suffix(
+    mocker: MockerFixture, monkeypatch: MonkeyPatch, tmp_path
+) -> None:
     """Test edit() function with custom suffix."""
     mock_get_editor = mocker.patch("editor.get_editor")
     mock_get_editor_args = mocker.patch("editor.get_editor_args")
@@ -289,23 +400,18 @@ def test_edit_with_suffix(mocker: MockerFixture) -> None:
     mock_process = mocker.MagicMock()
     mock_popen.return_value = mock_process
 
-    mock_tempfile = mocker.patch("tempfile.NamedTemporaryFile")
-    mock_temp = mocker.MagicMock()
-    mock_temp.name = "/tmp/tmp123.md"
-    mock_tempfile.return_value = mock_temp
-
-    mock_open = mocker.mock_open(read_data=b"test content")
-    mocker.patch("builtins.open", mock_open)
-    mocker.patch("sys.stdin.isatty", return_value=True)
-    mocker.patch("sys.stdout.isatty", return_value=True)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    mock_mkstemp = mocker.spy(tempfile, "mkstemp")
 
     result = editor.edit(suffix=".md")
 
-    mock_tempfile.assert_called_once_with(suffix=".md")
-    assert result == b"test content"
+    mock_mkstemp.assert_called_once_with(suffix=".md")
+    assert mock_popen.call_args[0][0][-1].endswith(".md")
+    assert result == b""
+    assert list(tmp_path.iterdir()) == []
 
 
-def test_edit_explicit_use_tty_true(mocker: MockerFixture) -> None:
+def test_edit_explicit_use_tty_true(mocker: MockerFixture, test_file: str) -> None:
     """Test edit() function with explicit use_tty=True."""
     mock_get_editor = mocker.patch("editor.get_editor")
     mock_get_editor_args = mocker.patch("editor.get_editor_args")
@@ -317,24 +423,82 @@ def test_edit_explicit_use_tty_true(mocker: MockerFixture) -> None:
     mock_process = mocker.MagicMock()
     mock_popen.return_value = mock_process
 
-    mock_tty_file = mocker.MagicMock()
-    read_mock = mocker.mock_open(read_data=b"test content")
-
-    mock_open_func = mocker.patch("builtins.open")
-    mock_open_func.side_effect = [mock_tty_file, read_mock.return_value]
-    mocker.patch("editor.get_tty_filename", return_value="/dev/tty")
+    mocker.patch("editor._get_tty_stdout", return_value=42)
 
-    result = editor.edit(filename="/tmp/test.txt", use_tty=True)
+    result = editor.edit(filename=test_file, use_tty=True)
 
     assert result == b"test content"
     mock_popen.assert_called_once_with(
-        ["/usr/bin/vim", "-f", "-o", "/tmp/test.txt"],
-        close_fds=True,
-        stdout=mock_tty_file,
+        ["/usr/bin/vim", "-f", "-o", test_file],
+        close_fds=False,
+        stdout=42,
+    )
+
+
+def test_edit_gui_editor_skips_tty(mocker: MockerFixture, test_file: str) -> None:
+    """Test edit() does not default to the TTY for editors with their own window."""
+    mocker.patch("editor.get_editor", return_value="/usr/bin/gedit")
+    mock_popen = mocker.patch("subprocess.Popen")
+    mock_get_tty_stdout = mocker.patch("editor._get_tty_stdout")
+    mocker.patch("editor._STDIN_TTY", True)
+    mocker.patch("editor._STDOUT_TTY", False)
+
+    editor.edit(filename=test_file)
+
+    mock_get_tty_stdout.assert_not_called()
+    mock_popen.assert_called_once_with(
+        ["/usr/bin/gedit", "-w", "--new-window", test_file],
+        close_fds=False,
+        stdout=None,
+    )
+
+
+@pytest.mark.parametrize(
+    "editor_command,use_tty",
+    [
+        ("/usr/bin/gvim -v", None),  # gvim running Vim in the terminal
+        ("/usr/bin/gedit", True),  # explicit use_tty is honoured
+    ],
+)
+def test_edit_gui_editor_uses_tty(
+    mocker: MockerFixture,
+    test_file: str,
+    editor_command: str,
+    use_tty: Optional[bool],
+) -> None:
+    """Test the GUI exception only applies to the default use_tty."""
+    mocker.patch("editor.get_editor", return_value=editor_command)
+    mock_popen = mocker.patch("subprocess.Popen")
+    mocker.patch("editor._get_tty_stdout", return_value=42)
+    mocker.patch("editor._STDIN_TTY", True)
+    mocker.patch("editor._STDOUT_TTY", False)
+
+    editor.edit(filename=test_file, use_tty=use_tty)
+
+    assert mock_popen.call_args[1]["stdout"] == 42
+
+
+def test_edit_reuses_config(mocker: MockerFixture, test_file: str) -> None:
+    """Test edit() resolves the editor once until the cache is cleared."""
+    mock_get_editor = mocker.patch("editor.get_editor")
+    mock_get_editor.return_value = "/usr/bin/vim"
+    mock_popen = mocker.patch("subprocess.Popen")
+
+    editor.edit(filename=test_file, use_tty=False)
+    editor.edit(filename=test_file, use_tty=False)
+    assert mock_get_editor.call_count == 1
+
+    editor.clear_editor_cache()
+    mock_get_editor.return_value = "/usr/bin/nano"
+    editor.edit(filename=test_file, use_tty=False)
+
+    assert mock_get_editor.call_count == 2
+    mock_popen.assert_called_with(
+        ["/usr/bin/nano", "-R", test_file], close_fds=False, stdout=None
     )
 
 
-def test_edit_explicit_use_tty_false(mocker: MockerFixture) -> None:
+def test_edit_explicit_use_tty_false(mocker: MockerFixture, test_file: str) -> None:
     """Test edit() function with explicit use_tty=False."""
     mock_get_editor = mocker.patch("editor.get_editor")
     mock_get_editor_args = mocker.patch("editor.get_editor_args")
@@ -346,12 +510,9 @@ def test_edit_explicit_use_tty_false(mocker: MockerFixture) -> None:
     mock_process = mocker.MagicMock()
     mock_popen.return_value = mock_process
 
-    mock_open = mocker.mock_open(read_data=b"test content")
-    mocker.patch("builtins.open", mock_open)
-
-    result = editor.edit(filename="/tmp/test.txt", use_tty=False)
+    result = editor.edit(filename=test_file, use_tty=False)
 
     assert result == b"test content"
     mock_popen.assert_called_once_with(
-        ["/usr/bin/vim", "-f", "-o", "/tmp/test.txt"], close_fds=True, stdout=None
+        ["/usr/bin/vim", "-f", "-o", test_file], close_fds=False, stdout=None
     )